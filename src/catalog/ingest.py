@@ -24,20 +24,32 @@ Example:
 from __future__ import annotations
 
 import argparse
+import functools
+import hashlib
 import json
 import os
 import sqlite3
+import stat
 import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 CHATREPLAY_EXTENSION = ".chatreplay.json"
 DEFAULT_DB_NAME = "copilot_chat_logs.db"
 DEFAULT_OUTPUT_DIR = Path(".vscode") / "CopilotChatHistory"
-CATALOG_VERSION = "2"
+CATALOG_VERSION = "4"
 READ_ME_NAME = "README_CopilotChatHistory.md"
 SCHEMA_MANIFEST_NAME = "schema_manifest.json"
+# Below this many files the cost of starting worker processes outweighs parallel parsing.
+PARALLEL_PARSE_MIN_FILES = 8
+
+# Shared encoders so json.dumps does not build a new JSONEncoder per call.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_JSON_ASCII_ENCODER = json.JSONEncoder(ensure_ascii=True)
 
 SCHEMA_VERSION_HISTORY: List[Dict[str, Any]] = [
     {
@@ -48,13 +60,27 @@ SCHEMA_VERSION_HISTORY: List[Dict[str, Any]] = [
         ],
     },
     {
-        "version": CATALOG_VERSION,
+        "version": "2",
         "released": "2025-10-22",
         "changes": [
             "Added source_kind classifier to prompts for downstream filtering.",
             "Introduced schema migration runner for forward-compatible upgrades.",
         ],
     },
+    {
+        "version": "3",
+        "released": "2026-10-16",
+        "changes": [
+            "Added content_hash to prompts so re-imports skip unchanged prompts.",
+        ],
+    },
+    {
+        "version": CATALOG_VERSION,
+        "released": "2026-10-16",
+        "changes": [
+            "Added indexed session_id and agent_id to prompt_logs so consumers can filter in SQL.",
+        ],
+    },
 ]
 
 
@@ -62,7 +88,15 @@ class UserVisibleError(RuntimeError):
     """Raised when user-facing validation fails."""
 
 
-def vscode_user_dirs() -> Sequence[Path]:
+def _is_dir(path: Path) -> bool:
+    try:
+        return stat.S_ISDIR(path.stat().st_mode)
+    except OSError:
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def vscode_user_dirs() -> Tuple[Path, ...]:
     dirs: List[Path] = []
     platform = sys.platform
     home = Path.home()
@@ -91,79 +125,123 @@ def vscode_user_dirs() -> Sequence[Path]:
             config_base / "Code - OSS" / "User",
         ])
 
-    return [path for path in dirs if path.exists()]
+    return tuple(path for path in dirs if _is_dir(path))
 
 
-def default_storage_dirs() -> Sequence[Path]:
+@functools.lru_cache(maxsize=1)
+def default_storage_dirs() -> Tuple[Path, ...]:
     dirs: List[Path] = []
     for user_dir in vscode_user_dirs():
         candidate = user_dir / "globalStorage" / "github.copilot-chat"
-        if candidate.exists():
+        if _is_dir(candidate):
             dirs.append(candidate)
-    return dirs
+    return tuple(dirs)
 
 
-def default_session_dirs() -> Sequence[Path]:
+@functools.lru_cache(maxsize=1)
+def default_session_dirs() -> Tuple[Path, ...]:
     dirs: List[Path] = []
     for user_dir in vscode_user_dirs():
         empty_window = user_dir / "globalStorage" / "emptyWindowChatSessions"
-        if empty_window.exists():
+        if _is_dir(empty_window):
             dirs.append(empty_window)
 
         workspace_storage = user_dir / "workspaceStorage"
-        if workspace_storage.exists():
-            for workspace_dir in workspace_storage.iterdir():
-                if not workspace_dir.is_dir():
-                    continue
-                chat_sessions = workspace_dir / "chatSessions"
-                if chat_sessions.exists():
-                    dirs.append(chat_sessions)
-    return dirs
+        try:
+            entries = list(os.scandir(workspace_storage))
+        except OSError:
+            continue
+        for entry in entries:
+            # DirEntry.is_dir() reuses the file type reported by the directory listing.
+            if not entry.is_dir():
+                continue
+            chat_sessions = Path(entry.path) / "chatSessions"
+            if _is_dir(chat_sessions):
+                dirs.append(chat_sessions)
+    return tuple(dirs)
+
+
+def iter_json_files(root: Path, *, recursive: bool) -> Iterator[str]:
+    """Yield the paths of ``*.json`` files under *root* in one ``os.scandir`` walk.
+
+    Directories are visited top-down in listing order and symlinked
+    directories are not followed, matching ``Path.rglob``.
+    """
+
+    pending = [str(root)]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError:
+            continue
+        subdirs: List[str] = []
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    if os.path.normcase(entry.name).endswith(".json"):
+                        yield entry.path
+                elif recursive and entry.is_dir() and not entry.is_symlink():
+                    subdirs.append(entry.path)
+            except OSError:
+                continue
+        pending.extend(reversed(subdirs))
 
 
 def gather_input_files(target: Optional[Path]) -> List[Path]:
-    seen: Set[Path] = set()
+    seen: Set[str] = set()
     candidates: List[Path] = []
 
-    def consider(path: Path) -> None:
-        if not path.is_file():
-            return
+    def add(path: str) -> None:
         try:
-            resolved = path.resolve(strict=False)
+            resolved = os.path.realpath(path)
         except OSError:
             resolved = path
         if resolved not in seen:
             seen.add(resolved)
-            candidates.append(resolved)
+            candidates.append(Path(resolved))
+
+    def is_chatreplay(path: str) -> bool:
+        return os.path.normcase(os.path.basename(path)).endswith(CHATREPLAY_EXTENSION)
 
     if target:
         target = target.expanduser()
         if target.is_file():
-            consider(target)
+            add(str(target))
         elif target.is_dir():
-            for pattern in (f"*{CHATREPLAY_EXTENSION}", "*.json"):
-                for item in target.rglob(pattern):
-                    consider(item)
+            # Chat replay exports first, then any other JSON (session archives).
+            found = list(iter_json_files(target, recursive=True))
+            for item in found:
+                if is_chatreplay(item):
+                    add(item)
+            for item in found:
+                if not is_chatreplay(item):
+                    add(item)
         else:
             raise UserVisibleError(f"No such file or directory: {target}")
     else:
         for directory in default_storage_dirs():
-            for item in directory.rglob(f"*{CHATREPLAY_EXTENSION}"):
-                consider(item)
+            for item in iter_json_files(directory, recursive=True):
+                if is_chatreplay(item):
+                    add(item)
         for directory in default_session_dirs():
-            for item in directory.glob("*.json"):
-                consider(item)
+            for item in iter_json_files(directory, recursive=False):
+                add(item)
 
     return candidates
 
 
 def safe_json_dumps(payload: Any) -> str:
-    text = json.dumps(payload, ensure_ascii=False)
+    text = _JSON_ENCODER.encode(payload)
+    if text.isascii():
+        return text
     try:
         text.encode("utf-8")
         return text
     except UnicodeEncodeError:
-        return json.dumps(payload, ensure_ascii=True)
+        # Lone surrogates cannot be stored as UTF-8; fall back to escapes.
+        return _JSON_ASCII_ENCODER.encode(payload)
 
 
 def ms_to_iso(value: Any) -> Optional[str]:
@@ -211,7 +289,9 @@ def convert_session_to_prompts(data: Dict[str, Any], path: Path) -> List[Dict[st
         if first_text is None and message_text:
             first_text = message_text
 
-        request_log = {key: value for key, value in request.items() if key not in {"response", "result"}}
+        request_log = dict(request)
+        response_payload = request_log.pop("response", None)
+        result_payload = request_log.pop("result", None)
         request_log["id"] = request_id
         request_log["kind"] = "request"
         if time_iso and "time" not in request_log:
@@ -219,8 +299,6 @@ def convert_session_to_prompts(data: Dict[str, Any], path: Path) -> List[Dict[st
 
         logs.append(request_log)
 
-        response_payload = request.get("response")
-        result_payload = request.get("result")
         if response_payload is None and result_payload is None:
             continue
 
@@ -243,7 +321,8 @@ def convert_session_to_prompts(data: Dict[str, Any], path: Path) -> List[Dict[st
 
         logs.append(response_log)
 
-    session_metadata = {key: value for key, value in data.items() if key != "requests"}
+    session_metadata = dict(data)
+    del session_metadata["requests"]
 
     prompt = {
         "promptId": session_id,
@@ -284,7 +363,75 @@ def load_prompts(path: Path) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     return prompts, metadata
 
 
+def iter_loaded_prompts(
+    files: Sequence[Path],
+) -> Iterator[Tuple[Path, List[Dict[str, Any]], Dict[str, Any]]]:
+    """Yield ``(path, prompts, metadata)`` for each file, in the order given.
+
+    Larger batches are parsed in worker processes; at most two files per
+    worker are in flight so parsed payloads do not pile up ahead of the
+    (single-connection) writer.
+    """
+
+    workers = min(len(files), os.cpu_count() or 1)
+    if len(files) < PARALLEL_PARSE_MIN_FILES or workers < 2:
+        for path in files:
+            prompts, metadata = load_prompts(path)
+            yield path, prompts, metadata
+        return
+
+    remaining = iter(files)
+    pending: deque[Tuple[Path, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in remaining:
+            pending.append((path, pool.submit(load_prompts, path)))
+            if len(pending) >= workers * 2:
+                break
+        try:
+            while pending:
+                path, future = pending.popleft()
+                prompts, metadata = future.result()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending.append((next_path, pool.submit(load_prompts, next_path)))
+                yield path, prompts, metadata
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def configure_connection(conn: sqlite3.Connection) -> None:
+    """Tune an autocommit-mode connection for bulk loading."""
+
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    """Run the enclosed statements in one explicit transaction.
+
+    Expects a connection opened with ``isolation_level=None`` so the sqlite3
+    module does not issue its own implicit BEGIN/COMMIT.
+    """
+
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
 def ensure_schema(conn: sqlite3.Connection) -> None:
+    ensure_tables(conn)
+    ensure_indexes(conn)
+
+
+def ensure_tables(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS prompts (
@@ -295,7 +442,8 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
             source_file TEXT,
             source_kind TEXT,
             imported_at TEXT,
-            raw_json TEXT
+            raw_json TEXT,
+            content_hash TEXT
         )
         """
     )
@@ -310,6 +458,8 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
             time TEXT,
             summary TEXT,
             raw_json TEXT,
+            session_id TEXT,
+            agent_id TEXT,
             PRIMARY KEY (prompt_id, log_id),
             FOREIGN KEY (prompt_id) REFERENCES prompts(prompt_id)
         )
@@ -376,19 +526,30 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
         """
     )
 
+
+def ensure_indexes(conn: sqlite3.Connection) -> None:
     conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_logs_kind ON prompt_logs(kind)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_logs_prompt ON prompt_logs(prompt_id, log_index)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_logs_session ON prompt_logs(session_id)")
     conn.execute(
         "CREATE INDEX IF NOT EXISTS idx_tool_results_prompt ON tool_results(prompt_id, log_id, part_index)"
     )
 
 
-def _table_has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    return row is not None
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> Set[str]:
     try:
-        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
     except sqlite3.OperationalError:
-        return False
-    return any(row[1] == column for row in info)
+        return set()
+
+
+def _table_has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return column in _table_columns(conn, table)
 
 
 def detect_schema_version(conn: sqlite3.Connection) -> str:
@@ -400,10 +561,17 @@ def detect_schema_version(conn: sqlite3.Connection) -> str:
     except sqlite3.OperationalError:
         pass
 
-    if _table_has_column(conn, "prompts", "source_kind"):
+    if "session_id" in _table_columns(conn, "prompt_logs"):
+        return "4"
+
+    columns = _table_columns(conn, "prompts")
+    if "content_hash" in columns:
+        return "3"
+
+    if "source_kind" in columns:
         return "2"
 
-    if _table_has_column(conn, "prompts", "prompt_id"):
+    if "prompt_id" in columns:
         return "1"
 
     return "0"
@@ -426,9 +594,36 @@ def migrate_v1_to_v2(conn: sqlite3.Connection) -> None:
     )
 
 
+def migrate_v2_to_v3(conn: sqlite3.Connection) -> None:
+    # Existing rows keep a NULL hash, so their next import rewrites them once.
+    if not _table_has_column(conn, "prompts", "content_hash"):
+        conn.execute("ALTER TABLE prompts ADD COLUMN content_hash TEXT")
+
+
+def migrate_v3_to_v4(conn: sqlite3.Connection) -> None:
+    columns = _table_columns(conn, "prompt_logs")
+    for column in ("session_id", "agent_id"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE prompt_logs ADD COLUMN {column} TEXT")
+
+    # Unchanged prompts are skipped on re-import, so backfill existing logs here.
+    updates: List[Tuple[Any, ...]] = []
+    for rowid, raw_json in conn.execute("SELECT rowid, raw_json FROM prompt_logs"):
+        try:
+            log = json.loads(raw_json)
+        except (TypeError, ValueError):
+            continue
+        session_id, agent_id = log_session_ids(log)
+        if session_id is not None or agent_id is not None:
+            updates.append((session_id, agent_id, rowid))
+    conn.executemany("UPDATE prompt_logs SET session_id = ?, agent_id = ? WHERE rowid = ?", updates)
+
+
 MigrationFunc = Callable[[sqlite3.Connection], None]
 SCHEMA_MIGRATIONS: Dict[str, Tuple[str, MigrationFunc]] = {
     "1": ("2", migrate_v1_to_v2),
+    "2": ("3", migrate_v2_to_v3),
+    "3": ("4", migrate_v3_to_v4),
 }
 
 
@@ -443,19 +638,15 @@ def run_schema_migrations(conn: sqlite3.Connection) -> str:
         next_version, func = step
         func(conn)
         migrated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
-        conn.execute(
-            """
-            INSERT INTO catalog_metadata(key, value) VALUES(?, ?)
-            ON CONFLICT(key) DO UPDATE SET value=excluded.value
-            """,
-            ("schema_version", next_version),
-        )
-        conn.execute(
+        conn.executemany(
             """
             INSERT INTO catalog_metadata(key, value) VALUES(?, ?)
             ON CONFLICT(key) DO UPDATE SET value=excluded.value
             """,
-            ("schema_migrated_at_utc", migrated_at),
+            [
+                ("schema_version", next_version),
+                ("schema_migrated_at_utc", migrated_at),
+            ],
         )
         current = next_version
 
@@ -501,19 +692,62 @@ def extract_time(log: Dict[str, Any]) -> Optional[str]:
     return None
 
 
-def iter_tool_parts(log: Dict[str, Any]) -> Iterable[str]:
+def log_session_ids(log: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Return the ``(sessionId, agentId)`` strings from a response log's result metadata."""
+
+    result = log.get("result") if isinstance(log, dict) else None
+    metadata = result.get("metadata") if isinstance(result, dict) else None
+    if not isinstance(metadata, dict):
+        return None, None
+    session_id = metadata.get("sessionId")
+    agent_id = metadata.get("agentId")
+    return (
+        session_id if isinstance(session_id, str) else None,
+        agent_id if isinstance(agent_id, str) else None,
+    )
+
+
+def tool_parts(log: Dict[str, Any]) -> List[str]:
     content = log.get("response")
     if isinstance(content, list):
-        for item in content:
-            if isinstance(item, str):
-                yield item
-            else:
-                yield safe_json_dumps(item)
-    elif isinstance(content, (str, int, float)):
-        yield str(content)
+        return [item if isinstance(item, str) else safe_json_dumps(item) for item in content]
+    if isinstance(content, (str, int, float)):
+        return [str(content)]
+    return []
+
+
+def dump_prompt_json(prompt: Dict[str, Any], log_jsons: Sequence[str]) -> str:
+    """Serialize *prompt* reusing the already-encoded entries of its ``logs`` list.
+
+    Produces the same text as ``safe_json_dumps(prompt)`` (only the escaping
+    of lone surrogates is decided per log) without walking the log payloads a
+    second time.
+    """
+
+    members: List[str] = []
+    for key, value in prompt.items():
+        encoded = "[" + ", ".join(log_jsons) + "]" if key == "logs" else safe_json_dumps(value)
+        members.append(f"{safe_json_dumps(key)}: {encoded}")
+    return "{" + ", ".join(members) + "}"
 
 
-def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Dict[str, Any]) -> None:
+def load_content_hashes(conn: sqlite3.Connection) -> Dict[str, Optional[str]]:
+    return dict(conn.execute("SELECT prompt_id, content_hash FROM prompts"))
+
+
+def ingest_prompt(
+    conn: sqlite3.Connection,
+    prompt: Dict[str, Any],
+    metadata: Dict[str, Any],
+    *,
+    known_hashes: Optional[Dict[str, Optional[str]]] = None,
+) -> None:
+    """Upsert *prompt* and rewrite its logs unless its content is unchanged.
+
+    *known_hashes* (from ``load_content_hashes``) replaces the per-prompt
+    hash lookup and is kept current as prompts are written.
+    """
+
     prompt_id = str(prompt.get("promptId") or prompt.get("id") or "")
     if not prompt_id:
         raise UserVisibleError("Prompt is missing a promptId; cannot store.")
@@ -521,7 +755,28 @@ def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Di
     prompt_text = str(prompt.get("prompt") or "")
     has_seen = 1 if prompt.get("hasSeen") else 0
     log_count = int(prompt.get("logCount") or len(prompt.get("logs") or []))
-    raw_json = safe_json_dumps(prompt)
+    logs = prompt.get("logs")
+    log_jsons: Optional[List[str]] = None
+    if isinstance(logs, list):
+        # Serialize each log once; the prompt payload embeds the same text.
+        log_jsons = [safe_json_dumps(log) for log in logs]
+        raw_json = dump_prompt_json(prompt, log_jsons)
+    else:
+        raw_json = safe_json_dumps(prompt)
+    content_hash = hashlib.blake2b(raw_json.encode("utf-8"), digest_size=16).hexdigest()
+    if known_hashes is not None:
+        is_new_prompt = prompt_id not in known_hashes
+        stored_hash = known_hashes.get(prompt_id)
+    else:
+        row = conn.execute("SELECT content_hash FROM prompts WHERE prompt_id = ?", (prompt_id,)).fetchone()
+        is_new_prompt = row is None
+        stored_hash = None if row is None else row[0]
+    if not is_new_prompt and stored_hash == content_hash:
+        # Unchanged since the last import; its logs and tool results are current.
+        return
+    if known_hashes is not None:
+        known_hashes[prompt_id] = content_hash
+
     source_file = str(metadata.get("source_file") or "")
     source_kind = str(metadata.get("source_kind") or "").strip()
     if not source_kind:
@@ -535,8 +790,10 @@ def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Di
 
     conn.execute(
         """
-        INSERT INTO prompts(prompt_id, prompt_text, has_seen, log_count, source_file, source_kind, imported_at, raw_json)
-        VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO prompts(
+            prompt_id, prompt_text, has_seen, log_count, source_file, source_kind, imported_at, raw_json, content_hash
+        )
+        VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
         ON CONFLICT(prompt_id) DO UPDATE SET
             prompt_text=excluded.prompt_text,
             has_seen=excluded.has_seen,
@@ -544,7 +801,8 @@ def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Di
             source_file=excluded.source_file,
             source_kind=excluded.source_kind,
             imported_at=excluded.imported_at,
-            raw_json=excluded.raw_json
+            raw_json=excluded.raw_json,
+            content_hash=excluded.content_hash
         """,
         (
             prompt_id,
@@ -555,17 +813,15 @@ def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Di
             source_kind,
             metadata["imported_at"],
             raw_json,
+            content_hash,
         ),
     )
 
-
-    logs = prompt.get("logs")
-    if not isinstance(logs, list):
+    if log_jsons is None:
         return
 
-    conn.execute("DELETE FROM prompt_logs WHERE prompt_id = ?", (prompt_id,))
-    conn.execute("DELETE FROM tool_results WHERE prompt_id = ?", (prompt_id,))
-
+    log_rows: List[Tuple[Any, ...]] = []
+    tool_rows: List[Tuple[Any, ...]] = []
     for index, log in enumerate(logs):
         if not isinstance(log, dict):
             continue
@@ -573,13 +829,10 @@ def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Di
         kind = str(log.get("kind") or "unknown")
         summary = summarize_log(log)
         time_value = extract_time(log)
-        raw_log_json = safe_json_dumps(log)
+        raw_log_json = log_jsons[index]
+        session_id, agent_id = log_session_ids(log)
 
-        conn.execute(
-            """
-            INSERT INTO prompt_logs(prompt_id, log_id, log_index, kind, time, summary, raw_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
+        log_rows.append(
             (
                 prompt_id,
                 log_id,
@@ -588,23 +841,34 @@ def ingest_prompt(conn: sqlite3.Connection, prompt: Dict[str, Any], metadata: Di
                 time_value,
                 summary,
                 raw_log_json,
-            ),
+                session_id,
+                agent_id,
+            )
         )
 
         if kind == "toolCall":
-            for part_index, part in enumerate(iter_tool_parts(log)):
-                conn.execute(
-                    """
-                    INSERT INTO tool_results(prompt_id, log_id, part_index, content)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (
-                        prompt_id,
-                        log_id,
-                        part_index,
-                        part,
-                    ),
-                )
+            tool_rows.extend(
+                (prompt_id, log_id, part_index, part) for part_index, part in enumerate(tool_parts(log))
+            )
+
+    if not is_new_prompt:
+        conn.execute("DELETE FROM prompt_logs WHERE prompt_id = ?", (prompt_id,))
+        conn.execute("DELETE FROM tool_results WHERE prompt_id = ?", (prompt_id,))
+    conn.executemany(
+        """
+        INSERT INTO prompt_logs(prompt_id, log_id, log_index, kind, time, summary, raw_json, session_id, agent_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        log_rows,
+    )
+    conn.executemany(
+        """
+        INSERT INTO tool_results(prompt_id, log_id, part_index, content)
+        VALUES (?, ?, ?, ?)
+        """,
+        tool_rows,
+    )
+
 
 def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Import Copilot chat debug exports into a SQLite database.")
@@ -647,29 +911,16 @@ def resolve_paths(args: argparse.Namespace) -> Tuple[Path, Path]:
 
 def update_metadata(conn: sqlite3.Connection, *, source_files: Sequence[Path]) -> None:
     generated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
-    conn.execute(
-        """
-        INSERT INTO catalog_metadata(key, value) VALUES(?, ?)
-        ON CONFLICT(key) DO UPDATE SET value=excluded.value
-        """,
-        ("schema_version", CATALOG_VERSION),
-    )
-    conn.execute(
+    conn.executemany(
         """
         INSERT INTO catalog_metadata(key, value) VALUES(?, ?)
         ON CONFLICT(key) DO UPDATE SET value=excluded.value
         """,
-        ("generated_at_utc", generated_at),
-    )
-    conn.execute(
-        """
-        INSERT INTO catalog_metadata(key, value) VALUES(?, ?)
-        ON CONFLICT(key) DO UPDATE SET value=excluded.value
-        """,
-        (
-            "source_files",
-            ",".join(sorted({str(path) for path in source_files})),
-        ),
+        [
+            ("schema_version", CATALOG_VERSION),
+            ("generated_at_utc", generated_at),
+            ("source_files", ",".join(sorted({str(path) for path in source_files}))),
+        ],
     )
 
 def write_support_files(output_dir: Path, db_path: Path) -> List[Path]:
@@ -701,6 +952,11 @@ def write_support_files(output_dir: Path, db_path: Path) -> List[Path]:
                     },
                     {"name": "imported_at", "type": "TEXT", "meaning": "UTC timestamp of import."},
                     {"name": "raw_json", "type": "TEXT", "meaning": "Full prompt payload."},
+                    {
+                        "name": "content_hash",
+                        "type": "TEXT",
+                        "meaning": "BLAKE2b digest of raw_json; re-imports skip prompts whose hash is unchanged.",
+                    },
                 ],
             },
             {
@@ -714,6 +970,8 @@ def write_support_files(output_dir: Path, db_path: Path) -> List[Path]:
                     {"name": "time", "type": "TEXT", "meaning": "Timestamp when available."},
                     {"name": "summary", "type": "TEXT", "meaning": "Readable summary of the entry."},
                     {"name": "raw_json", "type": "TEXT", "meaning": "Full log payload."},
+                    {"name": "session_id", "type": "TEXT", "meaning": "Chat session id from the response metadata (indexed)."},
+                    {"name": "agent_id", "type": "TEXT", "meaning": "Agent id from the response metadata."},
                 ],
             },
             {
@@ -745,7 +1003,8 @@ def write_support_files(output_dir: Path, db_path: Path) -> List[Path]:
         ],
     }
 
-    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    with manifest_path.open("w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, ensure_ascii=False)
 
     readme_lines = [
         "# Copilot Chat History Catalog",
@@ -828,36 +1087,42 @@ def main(argv: Optional[Sequence[str]] = None) -> None:
             "No Copilot chat history files found (.chatreplay.json or chatSessions *.json)."
         )
 
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
     try:
-        if args.reset:
-            conn.executescript(
-                """
-                DROP TABLE IF EXISTS tool_results;
-                DROP TABLE IF EXISTS prompt_logs;
-                DROP TABLE IF EXISTS prompts;
-                """
-            )
-        ensure_schema(conn)
-        run_schema_migrations(conn)
+        configure_connection(conn)
+
+        with transaction(conn):
+            if args.reset:
+                conn.execute("DROP TABLE IF EXISTS tool_results")
+                conn.execute("DROP TABLE IF EXISTS prompt_logs")
+                conn.execute("DROP TABLE IF EXISTS prompts")
+            # Fresh tables are bulk loaded; build their indexes once the rows are in.
+            defer_indexes = not _table_exists(conn, "prompts")
+            ensure_tables(conn)
+            # Migrate first: indexes may cover columns that older catalogs lack.
+            run_schema_migrations(conn)
+            if not defer_indexes:
+                ensure_indexes(conn)
 
         imported_files: List[Path] = []
         total_prompts = 0
 
-        for file_path in files:
-            prompts, metadata = load_prompts(file_path)
-            if not prompts:
-                continue
-            imported_files.append(file_path)
-            for prompt in prompts:
-                ingest_prompt(conn, prompt, metadata)
-            total_prompts += len(prompts)
+        with transaction(conn):
+            known_hashes = load_content_hashes(conn)
+            for file_path, prompts, metadata in iter_loaded_prompts(files):
+                if not prompts:
+                    continue
+                imported_files.append(file_path)
+                for prompt in prompts:
+                    ingest_prompt(conn, prompt, metadata, known_hashes=known_hashes)
+                total_prompts += len(prompts)
 
-        if not imported_files:
-            raise UserVisibleError("No usable chat history entries were found.")
+            if not imported_files:
+                raise UserVisibleError("No usable chat history entries were found.")
 
-        update_metadata(conn, source_files=imported_files)
-        conn.commit()
+            if defer_indexes:
+                ensure_indexes(conn)
+            update_metadata(conn, source_files=imported_files)
     finally:
         conn.close()
 
@@ -91,11 +91,6 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     return parser.parse_args(argv)
 
 
-def load_json(path: Path) -> Any:
-    with path.open("r", encoding="utf-8") as handle:
-        return json.load(handle)
-
-
 def normalise_workspace_key(label: Optional[str]) -> Optional[str]:
     if not label:
         return None
@@ -125,8 +120,15 @@ def collect_candidate_sessions(target: Optional[Path]) -> List[SessionRecord]:
     sessions: List[SessionRecord] = []
     for file_path in files:
         try:
-            data = load_json(file_path)
-        except (json.JSONDecodeError, OSError):
+            text = file_path.read_text(encoding="utf-8")
+        except OSError:
+            continue
+        # Sessions always carry a "requests" key; skip other exports without parsing them.
+        if '"requests"' not in text:
+            continue
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
             continue
         if is_vscode_chat_session(data):
             workspace_key = normalise_workspace_key(workspace_key_from_source(str(file_path)))
@@ -252,16 +254,17 @@ def collect_sessions_from_database(db_path: Path) -> List[SessionRecord]:
     records: List[SessionRecord] = []
     with sqlite3.connect(db_path) as conn:
         conn.row_factory = sqlite3.Row
-        prompt_rows = conn.execute("SELECT prompt_id, raw_json, source_file FROM prompts")
+        # Only the session object is needed here (the logs are read from prompt_logs),
+        # so SQLite projects it out instead of Python decoding each full payload.
+        prompt_rows = conn.execute(
+            """
+            SELECT prompt_id, source_file, json_extract(raw_json, '$.session') AS session_json
+            FROM prompts
+            WHERE json_valid(raw_json) AND json_type(raw_json, '$.session') = 'object'
+            """
+        )
         for prompt_row in prompt_rows:
-            try:
-                prompt_payload = json.loads(prompt_row["raw_json"])
-            except (TypeError, ValueError, json.JSONDecodeError):
-                continue
-            session_meta = prompt_payload.get("session")
-            if not isinstance(session_meta, dict):
-                continue
-            session_copy = dict(session_meta)
+            session_copy = json.loads(prompt_row["session_json"])
             session_id = session_copy.get("sessionId") or prompt_row["prompt_id"]
             session_copy["sessionId"] = session_id
 
@@ -38,12 +38,13 @@ def squeeze(lines: Iterable[str]) -> List[str]:
     result: List[str] = []
     previous_blank = False
     for line in lines:
-        blank = not line.strip()
+        # Same test as ``not line.strip()`` without copying every line.
+        blank = not line or line.isspace()
         if blank and previous_blank:
             continue
         result.append(line)
         previous_blank = blank
-    while result and not result[-1].strip():
+    while result and (not result[-1] or result[-1].isspace()):
         result.pop()
     return result
 
@@ -328,22 +329,31 @@ def render_followups(request: Dict[str, Any]) -> List[str]:
     return lines
 
 
+_SEEN_MARKER_RE = re.compile(r"\s+—\s+seen before \(\d+×\)$")
+_FILE_URI_RE = re.compile(r"file:\/\/[^\s)]+")
+_WINDOWS_PATH_RE = re.compile(r"[a-z]:[\\/][^\s\"]+")
+_UNIX_PATH_RE = re.compile(r"\b\/[\w\-\.\/]+")
+_HEX_RE = re.compile(r"\b[0-9a-f]{8,}\b")
+_DIGITS_RE = re.compile(r"\d+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
 def _normalize_for_fingerprint(text: str) -> str:
     # Lowercase and normalize common variable parts (paths, URIs, UUIDs/hex, numbers)
     s = text.lower()
     # Remove seen markers if present
-    s = re.sub(r"\s+—\s+seen before \(\d+×\)$", "", s)
+    s = _SEEN_MARKER_RE.sub("", s)
     # Normalize file URIs
-    s = re.sub(r"file:\/\/[^\s)]+", "<uri>", s)
+    s = _FILE_URI_RE.sub("<uri>", s)
     # Normalize windows/unix paths
-    s = re.sub(r"[a-z]:[\\/][^\s\"]+", "<path>", s)
-    s = re.sub(r"\b\/[\w\-\.\/]+", "<path>", s)
+    s = _WINDOWS_PATH_RE.sub("<path>", s)
+    s = _UNIX_PATH_RE.sub("<path>", s)
     # Normalize long hex/uuids
-    s = re.sub(r"\b[0-9a-f]{8,}\b", "<hex>", s)
+    s = _HEX_RE.sub("<hex>", s)
     # Collapse numbers
-    s = re.sub(r"\d+", "#", s)
+    s = _DIGITS_RE.sub("#", s)
     # Whitespace collapse
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WHITESPACE_RE.sub(" ", s).strip()
     return s
 
 
@@ -6,76 +6,75 @@ import json
 import re
 from typing import Any, Dict, List, Tuple
 
+_OBJECT_START_RE = re.compile(r'\{')
+_DECODER = json.JSONDecoder()
+# Bold-only lines such as "**Preparing edit**" that wrap tool-call JSON
+_TOOL_WRAPPER_LINE_RE = re.compile(
+    r'^[^\S\n]*\*\*[^\n]*(?:preparing|reviewing|checking|verifying)[^\n]*\*\*[^\S\n]*(?:\n|$)',
+    re.IGNORECASE | re.MULTILINE,
+)
+_EXCESS_BLANK_LINES_RE = re.compile(r'\n{3,}')
 
-def extract_json_blocks(text: str) -> List[Dict[str, Any]]:
+# Parsed tool-call object plus its [start, end) span in the source text
+JsonBlock = Tuple[Dict[str, Any], int, int]
+
+
+def extract_json_blocks(text: str) -> List[JsonBlock]:
     """Extract JSON objects with 'kind' field from text.
     
     Handles both inline and multi-line JSON blocks that appear in VS Code
-    chat response text.
+    chat response text. Each candidate ``{`` is decoded in place with
+    ``raw_decode``, so braces inside JSON strings are handled correctly and
+    a successfully decoded object is never rescanned.
+
+    Returns ``(parsed, start, end)`` tuples in source order; the spans do not
+    overlap.
     """
-    extracted = []
-    brace_depth = 0
-    start_idx = None
+    extracted: List[JsonBlock] = []
+    if '{' not in text:
+        return extracted
+    cursor = 0
     
-    for i, char in enumerate(text):
-        if char == '{':
-            if brace_depth == 0:
-                start_idx = i
-            brace_depth += 1
-        elif char == '}':
-            brace_depth -= 1
-            if brace_depth == 0 and start_idx is not None:
-                candidate = text[start_idx:i+1]
-                try:
-                    parsed = json.loads(candidate)
-                    # Only accept objects that look like tool call metadata
-                    if isinstance(parsed, dict) and 'kind' in parsed:
-                        extracted.append(parsed)
-                except (json.JSONDecodeError, ValueError):
-                    pass
-                start_idx = None
+    for match in _OBJECT_START_RE.finditer(text):
+        start = match.start()
+        if start < cursor:
+            continue
+        try:
+            parsed, end = _DECODER.raw_decode(text, start)
+        except (json.JSONDecodeError, ValueError):
+            continue
+        # Only accept objects that look like tool call metadata
+        if isinstance(parsed, dict) and 'kind' in parsed:
+            extracted.append((parsed, start, end))
+        cursor = end
     
     return extracted
 
 
-def clean_response_text(text: str, json_blocks: List[Dict[str, Any]]) -> str:
+def clean_response_text(text: str, json_blocks: List[JsonBlock]) -> str:
     """Remove JSON blocks from response text, leaving only human-readable content.
     
+    Blocks are cut out by the source spans reported by extract_json_blocks.
     Also removes standalone markdown headings that were wrapping tool calls.
     """
     if not json_blocks:
         return text
     
-    # Remove each JSON block
-    cleaned = text
-    for block in json_blocks:
-        # Serialize back to match original
-        block_str = json.dumps(block, ensure_ascii=False, indent=2)
-        # Also try without indentation for inline blocks
-        block_str_inline = json.dumps(block, ensure_ascii=False)
-        
-        cleaned = cleaned.replace(block_str, '')
-        cleaned = cleaned.replace(block_str_inline, '')
+    # Splice out each JSON block by its source span
+    pieces = []
+    cursor = 0
+    for _, start, end in json_blocks:
+        pieces.append(text[cursor:start])
+        cursor = end
+    pieces.append(text[cursor:])
+    cleaned = ''.join(pieces)
     
     # Remove standalone markdown headings that typically wrap tool calls
     # Pattern: **Some text** on its own line
-    lines = cleaned.split('\n')
-    filtered_lines = []
-    for line in lines:
-        stripped = line.strip()
-        # Skip lines that are just bold markdown (tool call wrappers)
-        if stripped and stripped.startswith('**') and stripped.endswith('**'):
-            # Check if it looks like a tool call annotation
-            inner = stripped[2:-2]
-            if any(keyword in inner.lower() for keyword in ['preparing', 'reviewing', 'checking', 'verifying']):
-                continue
-        filtered_lines.append(line)
-    
-    cleaned = '\n'.join(filtered_lines)
+    cleaned = _TOOL_WRAPPER_LINE_RE.sub('', cleaned)
     
     # Clean up excessive blank lines
-    while '\n\n\n' in cleaned:
-        cleaned = cleaned.replace('\n\n\n', '\n\n')
+    cleaned = _EXCESS_BLANK_LINES_RE.sub('\n\n', cleaned)
     
     return cleaned.strip()
 
@@ -110,12 +109,14 @@ def normalize_response_with_actions(response: Any) -> Tuple[Any, List[Dict[str,
                     # Case 1: JSON embedded within a text block
                     json_blocks = extract_json_blocks(value)
                     if json_blocks:
-                        messages.extend(json_blocks)
+                        messages.extend(block for block, _, _ in json_blocks)
                         cleaned_value = clean_response_text(value, json_blocks)
                     else:
                         cleaned_value = value
                     # Preserve the textual portion if anything remains
-                    if cleaned_value:
+                    if cleaned_value is value:
+                        cleaned_responses.append(item)
+                    elif cleaned_value:
                         cleaned_item = item.copy()
                         cleaned_item['value'] = cleaned_value
                         cleaned_responses.append(cleaned_item)
@@ -129,7 +130,7 @@ def normalize_response_with_actions(response: Any) -> Tuple[Any, List[Dict[str,
 
     elif isinstance(response, str):
         json_blocks = extract_json_blocks(response)
-        messages.extend(json_blocks)
+        messages.extend(block for block, _, _ in json_blocks)
         cleaned = clean_response_text(response, json_blocks)
         return cleaned, messages
 
@@ -157,22 +158,17 @@ def inject_actions_into_request(request: Dict[str, Any]) -> Dict[str, Any]:
     
     # Extract from response text
     response = request.get('response')
+    if isinstance(response, str) and '{' not in response:
+        return request  # Nothing that could be embedded JSON
     cleaned_response, extracted_messages = normalize_response_with_actions(response)
     
     if extracted_messages:
-        # Make a copy to avoid mutating original
-        request_copy = request.copy()
-        result_copy = result.copy()
-        metadata_copy = metadata.copy()
-        
-        # Inject normalized messages
-        metadata_copy['messages'] = extracted_messages
-        result_copy['metadata'] = metadata_copy
-        request_copy['result'] = result_copy
-        
-        # Also clean the response text
-        request_copy['response'] = cleaned_response
-        
-        return request_copy
+        # Rebuild only the path down to metadata.messages so the original is
+        # not mutated; also swap in the cleaned response text
+        return {
+            **request,
+            'result': {**result, 'metadata': {**metadata, 'messages': extracted_messages}},
+            'response': cleaned_response,
+        }
     
     return request
@@ -1,72 +1,115 @@
 import argparse
+import functools
+import gc
 import hashlib
+import heapq
 import json
 import math
 import pickle
 import re
 import sqlite3
+import sys
+from array import array
 from collections import Counter, defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 DB_PATH = Path('AI-Agent-Workspace/live_chat.db')
 TOKEN_RE = re.compile(r"[\w']+")
-CACHE_VERSION = 1
+CACHE_VERSION = 4
+
+# term -> (document indexes, L2-normalized weights) as parallel typed arrays.
+Postings = Dict[str, Tuple[array, array]]
+
+# Argument values whose equality guarantees identical json.dumps output
+# (bool is its own type here, so True never collides with 1).
+FLAT_ARG_TYPES = (str, int, bool, type(None))
 
 
 @dataclass
 class Document:
+    # Explicit slots (not dataclass(slots=True), which needs 3.10) keep each of
+    # the many cached documents free of a per-instance __dict__.
+    __slots__ = ('doc_id', 'prompt_id', 'session_id', 'agent_id', 'label', 'text', 'kind', 'tool', 'status')
+
     doc_id: str
     prompt_id: str
     session_id: Optional[str]
     agent_id: Optional[str]
     label: str
     text: str
-    tags: Dict[str, str]
+    kind: str
+    tool: Optional[str]
+    status: Optional[str]
 
 
 def load_documents(db_path: Path, limit_sessions: Optional[Sequence[str]] = None, agent_filter: Optional[str] = None) -> List[Document]:
     conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
     try:
         docs: List[Document] = []
-        for row in conn.execute('SELECT prompt_id, raw_json FROM prompts'):
-            prompt_id = row['prompt_id']
-            entry = json.loads(row['raw_json'])
-            for log_index, log in enumerate(entry.get('logs', [])):
-                if log.get('kind') != 'response':
-                    continue
-                result = log.get('result')
-                if not isinstance(result, dict):
-                    continue
-                metadata = result.get('metadata')
-                if not isinstance(metadata, dict):
-                    continue
-                session_id = metadata.get('sessionId')
-                if limit_sessions and session_id not in limit_sessions:
-                    continue
-                agent_id = metadata.get('agentId')
-                if agent_filter and agent_id != agent_filter:
-                    continue
-                rendered_user = render_segments(metadata.get('renderedUserMessage'))
-                summary = metadata.get('summary') if isinstance(metadata.get('summary'), str) else ''
-                doc_label = f"prompt:{prompt_id} log:{log_index}"
-                base_text = '\n'.join(filter(None, [rendered_user, summary]))
-                if base_text:
-                    docs.append(Document(
-                        doc_id=f"{prompt_id}:{log_index}:turn",
-                        prompt_id=prompt_id,
-                        session_id=session_id,
-                        agent_id=agent_id,
-                        label=doc_label,
-                        text=base_text,
-                        tags={'type': 'turn'}
-                    ))
-                rounds = metadata.get('toolCallRounds') or []
-                if isinstance(rounds, list):
-                    for round_index, round_entry in enumerate(rounds):
-                        docs.extend(expand_round_documents(prompt_id, log_index, round_index, round_entry, metadata, session_id, agent_id))
+        # Response logs are stored individually by the ingestor, so only they are
+        # decoded rather than every prompt's full payload; order matches the
+        # prompts table followed by each prompt's log order.
+        where = ["l.kind = 'response'"]
+        params: List[str] = []
+        # Catalogs from schema v4 on carry indexed session/agent columns, so
+        # filtered runs skip decoding logs that cannot match.
+        if (limit_sessions or agent_filter) and 'session_id' in {row[1] for row in conn.execute("PRAGMA table_info(prompt_logs)")}:
+            if limit_sessions:
+                where.append(f"l.session_id IN ({', '.join('?' * len(limit_sessions))})")
+                params.extend(limit_sessions)
+            if agent_filter:
+                where.append("l.agent_id = ?")
+                params.append(agent_filter)
+        rows = conn.execute(
+            f"""
+            SELECT l.prompt_id, l.log_index, l.raw_json
+            FROM prompt_logs l
+            JOIN prompts p ON p.prompt_id = l.prompt_id
+            WHERE {' AND '.join(where)}
+            ORDER BY p.rowid, l.log_index
+            """,
+            params,
+        )
+        loads = json.loads
+        for prompt_id, log_index, raw_json in rows:
+            result = loads(raw_json).get('result')
+            if not isinstance(result, dict):
+                continue
+            metadata = result.get('metadata')
+            if not isinstance(metadata, dict):
+                continue
+            get = metadata.get
+            session_id = get('sessionId')
+            if limit_sessions and session_id not in limit_sessions:
+                continue
+            agent_id = get('agentId')
+            if agent_filter and agent_id != agent_filter:
+                continue
+            rendered_user = render_segments(get('renderedUserMessage'))
+            summary = get('summary')
+            if not isinstance(summary, str):
+                summary = ''
+            doc_label = f"prompt:{prompt_id} log:{log_index}"
+            base_text = '\n'.join(filter(None, [rendered_user, summary]))
+            if base_text:
+                docs.append(Document(
+                    doc_id=f"{prompt_id}:{log_index}:turn",
+                    prompt_id=prompt_id,
+                    session_id=session_id,
+                    agent_id=agent_id,
+                    label=doc_label,
+                    text=base_text,
+                    kind='turn',
+                    tool=None,
+                    status=None,
+                ))
+            rounds = get('toolCallRounds') or []
+            if isinstance(rounds, list):
+                for round_index, round_entry in enumerate(rounds):
+                    docs.extend(expand_round_documents(prompt_id, log_index, round_index, round_entry, metadata, session_id, agent_id))
         return docs
     finally:
         conn.close()
@@ -76,9 +119,10 @@ def expand_round_documents(prompt_id: str, log_index: int, round_index: int, rou
     docs: List[Document] = []
     if not isinstance(round_entry, dict):
         return docs
-    response_text = round_entry.get('response', '')
-    round_summary = round_entry.get('summary', '')
-    thinking = render_segments(round_entry.get('thinking'))
+    get = round_entry.get
+    response_text = get('response', '')
+    round_summary = get('summary', '')
+    thinking = render_segments(get('thinking'))
     round_components = '\n'.join(filter(None, [response_text, round_summary, thinking]))
     if round_components:
         docs.append(Document(
@@ -88,9 +132,11 @@ def expand_round_documents(prompt_id: str, log_index: int, round_index: int, rou
             agent_id=agent_id,
             label=f"{prompt_id} round {round_index}",
             text=round_components,
-            tags={'type': 'round'}
+            kind='round',
+            tool=None,
+            status=None,
         ))
-    tool_calls = round_entry.get('toolCalls') or []
+    tool_calls = get('toolCalls') or []
     if isinstance(tool_calls, list):
         for tool_call in tool_calls:
             doc = build_tool_call_document(tool_call, metadata, prompt_id, log_index, round_index, session_id, agent_id)
@@ -109,7 +155,7 @@ def build_tool_call_document(tool_call: dict, metadata: dict, prompt_id: str, lo
     if isinstance(args, str):
         args_text = args
     elif isinstance(args, dict):
-        args_text = json.dumps(args, ensure_ascii=False)
+        args_text = dumps_tool_args(args)
     result_payload = None
     tool_results = metadata.get('toolCallResults')
     if isinstance(tool_results, dict):
@@ -128,68 +174,117 @@ def build_tool_call_document(tool_call: dict, metadata: dict, prompt_id: str, lo
         agent_id=agent_id,
         label=f"{tool_name} ({call_id})",
         text=combined_text,
-        tags={'type': 'tool', 'tool': tool_name, 'status': status}
+        kind='tool',
+        tool=tool_name,
+        status=status,
     )
 
 
+def dumps_tool_args(args: dict) -> str:
+    """Serialize tool-call arguments, memoizing flat ones that repeat across turns."""
+    items = tuple((key, type(value), value) for key, value in args.items())
+    for _, value_type, _ in items:
+        if value_type not in FLAT_ARG_TYPES:
+            return json.dumps(args, ensure_ascii=False)
+    return _dumps_flat_args(items)
+
+
+@functools.lru_cache(maxsize=4096)
+def _dumps_flat_args(items: Tuple[Tuple[str, type, object], ...]) -> str:
+    return json.dumps({key: value for key, _, value in items}, ensure_ascii=False)
+
+
 def render_segments(value) -> str:
+    # Walks the tree with an explicit stack; joining every leaf once matches the
+    # nested per-level joins because an empty container renders as one '' leaf.
     if isinstance(value, str):
         return value
-    if isinstance(value, dict):
-        return ' '.join(render_segments(v) for v in value.values())
-    if isinstance(value, list):
-        return ' '.join(render_segments(item) for item in value)
-    return ''
+    parts: List[str] = []
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        if isinstance(item, dict):
+            item = list(item.values())
+        if isinstance(item, list) and item:
+            stack.extend(reversed(item))
+        else:
+            parts.append('')
+    return ' '.join(parts)
 
 
 def render_tool_result(payload) -> str:
-    if payload is None:
-        return ''
-    if isinstance(payload, dict):
-        if 'content' in payload and isinstance(payload['content'], list):
-            parts = [render_tool_result(part) for part in payload['content']]
-            return '\n'.join(filter(None, parts))
-        values = []
-        for key, value in payload.items():
-            if key in {'status', '$mid'}:
-                continue
-            text = render_tool_result(value)
+    # Same traversal as render_segments; empty leaves are dropped, so nested
+    # containers that render to nothing disappear from the join as before.
+    parts: List[str] = []
+    stack = [payload]
+    while stack:
+        item = stack.pop()
+        if item is None:
+            continue
+        if isinstance(item, dict):
+            content = item.get('content')
+            if isinstance(content, list):
+                stack.extend(reversed(content))
+            else:
+                stack.extend(reversed([value for key, value in item.items() if key not in {'status', '$mid'}]))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+        else:
+            text = item if isinstance(item, str) else str(item)
             if text:
-                values.append(text)
-        return '\n'.join(values)
-    if isinstance(payload, list):
-        return '\n'.join(filter(None, (render_tool_result(item) for item in payload)))
-    if isinstance(payload, str):
-        return payload
-    return str(payload)
+                parts.append(text)
+    return '\n'.join(parts)
 
 
 def tokenize(text: str) -> Counter:
-    tokens = TOKEN_RE.findall(text.lower())
-    return Counter(tokens)
+    # Interned tokens share one string object across every document's Counter.
+    return Counter(map(sys.intern, TOKEN_RE.findall(text.lower())))
 
 
 def build_tfidf_index(documents: List[Document]):
-    doc_term_counts: List[Counter] = [tokenize(doc.text) for doc in documents]
+    """Return ``(postings, df, total_docs)``.
+
+    ``postings`` maps each term to parallel arrays of document indexes and
+    weights, with every document vector already L2-normalized, so scoring a
+    query only touches documents that share one of its terms.
+    """
+    # Tool outputs and system preambles repeat verbatim; tokenize and weight each distinct text once.
+    slot_by_text: Dict[str, int] = {}
+    distinct_counts: List[Counter] = []
+    doc_slots: List[int] = []
+    for doc in documents:
+        slot = slot_by_text.get(doc.text)
+        if slot is None:
+            slot = slot_by_text[doc.text] = len(distinct_counts)
+            distinct_counts.append(tokenize(doc.text))
+        doc_slots.append(slot)
+    copies = [0] * len(distinct_counts)
+    for slot in doc_slots:
+        copies[slot] += 1
     df: defaultdict = defaultdict(int)
-    for counts in doc_term_counts:
+    for counts, copy_count in zip(distinct_counts, copies):
         for term in counts:
-            df[term] += 1
+            df[term] += copy_count
     total_docs = len(documents)
-    doc_vectors: List[Dict[str, float]] = []
-    norms: List[float] = []
-    for counts in doc_term_counts:
-        vec: Dict[str, float] = {}
-        norm_sq = 0.0
-        for term, count in counts.items():
-            idf = math.log((total_docs + 1) / (df[term] + 1)) + 1
-            weight = (count / sum(counts.values())) * idf
-            if weight:
-                vec[term] = weight
-                norm_sq += weight * weight
-        doc_vectors.append(vec)
-        norms.append(math.sqrt(norm_sq))
-    return doc_vectors, norms, df, total_docs
+    idf = {term: math.log((total_docs + 1) / (freq + 1)) + 1 for term, freq in df.items()}
+    vectors: List[List[Tuple[str, float]]] = []
+    for counts in distinct_counts:
+        term_total = sum(counts.values())
+        weights = [(term, (count / term_total) * idf[term]) for term, count in counts.items()]
+        norm = math.sqrt(sum(weight * weight for _, weight in weights))
+        vectors.append([(term, weight / norm) for term, weight in weights] if norm else [])
+    postings: Postings = {}
+    for doc_index, slot in enumerate(doc_slots):
+        for term, weight in vectors[slot]:
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = (array('i'), array('d'))
+            entry[0].append(doc_index)
+            entry[1].append(weight)
+    return postings, df, total_docs
 
 
 def compute_query_vector(query: str, df: Dict[str, int], total_docs: int):
@@ -204,23 +299,23 @@ def compute_query_vector(query: str, df: Dict[str, int], total_docs: int):
     return vec, math.sqrt(norm_sq)
 
 
-def cosine_similarity(vec_a: Dict[str, float], norm_a: float, vec_b: Dict[str, float], norm_b: float) -> float:
-    if not norm_a or not norm_b:
-        return 0.0
-    shared = set(vec_a.keys()) & set(vec_b.keys())
-    dot = sum(vec_a[t] * vec_b[t] for t in shared)
-    return dot / (norm_a * norm_b)
-
-
-def search(documents: List[Document], doc_vectors: List[Dict[str, float]], norms: List[float], df: Dict[str, int], total_docs: int, query: str, limit: int) -> List[tuple]:
+def search(documents: List[Document], postings: Postings, df: Dict[str, int], total_docs: int, query: str, limit: int) -> List[tuple]:
     query_vec, query_norm = compute_query_vector(query, df, total_docs)
+    if not query_norm:
+        return []
+    dots: Dict[int, float] = defaultdict(float)
+    for term, query_weight in query_vec.items():
+        entry = postings.get(term)
+        if entry is None:
+            continue
+        for doc_index, weight in zip(*entry):
+            dots[doc_index] += query_weight * weight
     scores = []
-    for doc, vec, norm in zip(documents, doc_vectors, norms):
-        score = cosine_similarity(query_vec, query_norm, vec, norm)
+    for doc_index in sorted(dots):
+        score = dots[doc_index] / query_norm
         if score > 0:
-            scores.append((score, doc))
-    scores.sort(key=lambda item: item[0], reverse=True)
-    return scores[:limit]
+            scores.append((score, documents[doc_index]))
+    return heapq.nlargest(limit, scores, key=lambda item: item[0])
 
 
 def compute_cache_key(db_path: Path, agent: Optional[str], sessions: Optional[Sequence[str]]) -> Tuple[str, float, int, Optional[str], Tuple[str, ...]]:
@@ -251,9 +346,21 @@ def cache_path_for_key(cache_dir: Path, key: Tuple[str, float, int, Optional[str
     return cache_dir / f'{digest}.pkl'
 
 
+@contextmanager
+def gc_paused():
+    """Suspend the cyclic GC; unpickling allocates many acyclic objects that it would otherwise rescan."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 def load_cached_payload(path: Path, key: Tuple[str, float, int, Optional[str], Tuple[str, ...]]):
     try:
-        with path.open('rb') as handle:
+        with path.open('rb') as handle, gc_paused():
             payload = pickle.load(handle)
     except (OSError, pickle.PickleError):
         return None
@@ -266,19 +373,18 @@ def load_cached_payload(path: Path, key: Tuple[str, float, int, Optional[str], T
     return payload
 
 
-def store_cache(path: Path, key: Tuple[str, float, int, Optional[str], Tuple[str, ...]], documents: List[Document], doc_vectors: List[Dict[str, float]], norms: List[float], df: Dict[str, int], total_docs: int) -> None:
+def store_cache(path: Path, key: Tuple[str, float, int, Optional[str], Tuple[str, ...]], documents: List[Document], postings: Postings, df: Dict[str, int], total_docs: int) -> None:
     payload = {
         'version': CACHE_VERSION,
         'key': key,
         'documents': documents,
-        'doc_vectors': doc_vectors,
-        'norms': norms,
+        'postings': postings,
         'df': dict(df),
         'total_docs': total_docs,
     }
     try:
         with path.open('wb') as handle:
-            pickle.dump(payload, handle)
+            pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
     except OSError:
         pass
 
@@ -302,8 +408,7 @@ def main():
     cache_path = cache_path_for_key(cache_dir, key)
 
     documents: List[Document]
-    doc_vectors: List[Dict[str, float]]
-    norms: List[float]
+    postings: Postings
     df: Dict[str, int]
     total_docs: int
 
@@ -313,19 +418,18 @@ def main():
 
     if payload:
         documents = payload['documents']
-        doc_vectors = payload['doc_vectors']
-        norms = payload['norms']
+        postings = payload['postings']
         df = payload['df']
         total_docs = payload['total_docs']
     else:
         documents = load_documents(args.db, args.session, args.agent)
         if not documents:
             raise SystemExit('No documents available. Ensure the catalog is populated.')
-        doc_vectors, norms, df, total_docs = build_tfidf_index(documents)
+        postings, df, total_docs = build_tfidf_index(documents)
         if not args.no_cache:
-            store_cache(cache_path, key, documents, doc_vectors, norms, df, total_docs)
+            store_cache(cache_path, key, documents, postings, df, total_docs)
 
-    results = search(documents, doc_vectors, norms, df, total_docs, args.query, args.limit)
+    results = search(documents, postings, df, total_docs, args.query, args.limit)
 
     if not results:
         print('No similar situations found.')
@@ -335,13 +439,11 @@ def main():
         snippet = doc.text.replace('\n', ' ')
         if len(snippet) > 220:
             snippet = snippet[:217] + '...'
-        status = doc.tags.get('status', '')
-        tool = doc.tags.get('tool', '')
         print(f"score={score:.3f} session={doc.session_id or 'unknown'} doc={doc.doc_id}")
-        if tool:
-            print(f"  tool={tool}")
-        if status:
-            print(f"  status={status}")
+        if doc.tool:
+            print(f"  tool={doc.tool}")
+        if doc.status:
+            print(f"  status={doc.status}")
         print(f"  {snippet}\n")
 
 
@@ -7,17 +7,24 @@ from typing import Dict, Iterable, List, Tuple
 
 ACTIONS_TITLE = re.compile(r"^\*\*[^*]+\*\*\s+—\s+.*$")
 SEEN_SUFFIX = re.compile(r"\s+—\s+seen before \(\d+×\)$", re.IGNORECASE)
+FILE_URI = re.compile(r"file:\/\/[^\s)]+")
+WINDOWS_PATH = re.compile(r"[a-z]:[\\/][^\s\"]+")
+UNIX_PATH = re.compile(r"\b\/[\w\-\.\/]+")
+HEX_RUN = re.compile(r"\b[0-9a-f]{8,}\b")
+DIGITS = re.compile(r"\d+")
+WHITESPACE = re.compile(r"\s+")
+TOKEN = re.compile(r"[a-zA-Z0-9_`./:-]+")
 
 
 def normalize(text: str) -> str:
     t = text.lower().strip()
     t = SEEN_SUFFIX.sub("", t)
-    t = re.sub(r"file:\/\/[^\s)]+", "<uri>", t)
-    t = re.sub(r"[a-z]:[\\/][^\s\"]+", "<path>", t)
-    t = re.sub(r"\b\/[\w\-\.\/]+", "<path>", t)
-    t = re.sub(r"\b[0-9a-f]{8,}\b", "<hex>", t)
-    t = re.sub(r"\d+", "#", t)
-    t = re.sub(r"\s+", " ", t)
+    t = FILE_URI.sub("<uri>", t)
+    t = WINDOWS_PATH.sub("<path>", t)
+    t = UNIX_PATH.sub("<path>", t)
+    t = HEX_RUN.sub("<hex>", t)
+    t = DIGITS.sub("#", t)
+    t = WHITESPACE.sub(" ", t)
     return t
 
 
@@ -67,7 +74,7 @@ def main() -> None:
 
     # Fuzzy: Jaccard over token sets for near matches
     def tokens(s: str) -> set:
-        return set(re.findall(r"[a-zA-Z0-9_`./:-]+", normalize(s)))
+        return set(TOKEN.findall(normalize(s)))
 
     q_tok = tokens(args.query)
     scored: List[Tuple[float, str]] = []